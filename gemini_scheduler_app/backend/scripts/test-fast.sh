@@ -0,0 +1,5 @@
+#!/usr/bin/env bash
+# Runs the backend tests without slow/remote tests (the pytest.ini default).
+set -euo pipefail
+cd "$(dirname "$0")/.."
+exec python -m pytest "$@"
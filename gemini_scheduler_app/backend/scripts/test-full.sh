@@ -0,0 +1,5 @@
+#!/usr/bin/env bash
+# Runs every backend test, including those marked slow or remote.
+set -euo pipefail
+cd "$(dirname "$0")/.."
+exec python -m pytest -m "" "$@"
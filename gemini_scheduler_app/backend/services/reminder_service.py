@@ -5,9 +5,13 @@ from models.event import Event
 from models.user import User
 from datetime import datetime, timedelta
 
+# (event_id, recipient, subject) for each reminder sent by the latest send_event_reminders() run.
+_LAST_SENT = []
+
 def send_event_reminders():
     current_app = get_flask_app() # Get a Flask app instance
     with current_app.app_context():
+        _LAST_SENT.clear()
         now = datetime.utcnow()
         # Define a window for reminders: events starting from 10 mins ago to 1 hour from now.
         # This handles cases where the task might run slightly late.
@@ -29,8 +33,9 @@ def send_event_reminders():
         sent_count = 0
         for event, user_email in events_to_remind:
             try:
+                subject = f"Reminder: {event.title}"
                 msg = Message(
-                    subject=f"Reminder: {event.title}",
+                    subject=subject,
                     recipients=[user_email],
                     body=f"Hello,\n\nThis is a reminder for your event:\n\nEvent: {event.title}\nStarts at: {event.start_time.strftime('%Y-%m-%d %H:%M')} UTC\nDescription: {event.description or 'N/A'}",
                     sender=current_app.config.get('MAIL_DEFAULT_SENDER')
@@ -39,6 +44,7 @@ def send_event_reminders():
                 print(f"Simulating email to {user_email} for event: '{event.title}' (ID: {event.id})")
                 event.reminder_sent = True
                 db.session.add(event)
+                _LAST_SENT.append((event.id, user_email, subject))
                 sent_count += 1
             except Exception as e:
                 print(f"Error sending reminder for event ID {event.id} to {user_email}: {e}")
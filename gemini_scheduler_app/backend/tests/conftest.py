@@ -1,8 +1,47 @@
 import pytest
 import os
+import sys
+import types
+
+
+def _stub_gemini_sdk():
+    """Registers a lightweight google.generativeai module in sys.modules.
+
+    Every test mocks the Gemini model, so importing the real SDK (grpc, protobuf,
+    google.auth, ...) only adds start-up time. The stub must be in sys.modules
+    before any test module imports `services`, because services/__init__.py
+    eagerly imports gemini_service. conftest runs before collection, so calling
+    this at import time is enough; `app` itself does not import the service.
+    """
+    if "google.generativeai" in sys.modules:
+        return
+
+    genai_stub = types.ModuleType("google.generativeai")
+    genai_stub.configure = lambda **kwargs: None
+
+    class GenerativeModel:
+        def __init__(self, model_name, **kwargs):
+            self.model_name = model_name
+
+    genai_stub.GenerativeModel = GenerativeModel
+    sys.modules["google.generativeai"] = genai_stub
+
+    try:
+        import google # Namespace package shared by other google-* distributions
+    except ImportError:
+        google = types.ModuleType("google")
+        google.__path__ = []
+        sys.modules["google"] = google
+    google.generativeai = genai_stub
+
+
+_stub_gemini_sdk()
+
 from app import create_app, db as _db # alias db to avoid pytest fixture conflict
 
-TEST_DB_FILENAME = 'test_scheduler.db' # Keep it in backend/ for this test run for simplicity
+# Keep it in backend/ for this test run for simplicity.
+# Each pytest-xdist worker gets its own file so parallel sessions don't share one SQLite DB.
+TEST_DB_FILENAME = f"test_scheduler_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}.db"
 
 @pytest.fixture(scope='session')
 def app():